@@ -11,7 +11,7 @@ import sys
 import argparse
 
 # --- [全域常數] ---
-
+TOP_COMPANIES_FOR_PROMPT = 10 # 提供給 AI 參考的「最常被提及公司」數量
 
 # --- [函數定義區] ---
 def main(market=None):
@@ -53,6 +53,14 @@ def main(market=None):
     for article in articles:
         full_text_content += f"--- 新聞標題: {article['headline']} ---\n{article['content']}\n\n"
 
+    # 入庫時已建立公司提及索引，直接依提及文章數排出重點公司，不必再掃描全文
+    top_companies = database.get_company_mentions(market, limit=TOP_COMPANIES_FOR_PROMPT)
+    company_ranking = "\n".join(
+        f"- {c['name']} ({c['ticker']})：{c['article_count']} 篇新聞提及，共 {c['mention_count']} 次"
+        for c in top_companies
+    ) or "（無）"
+    print(f"公司提及索引共找出 {len(top_companies)} 家重點公司。")
+
     prompt = f"""
     你是一位頂尖的{market_name}財經分析師。你的任務是閱讀以下所有從網路爬取來的{market_name}財經新聞。
 
@@ -77,6 +85,9 @@ def main(market=None):
     4.  **未來關注產業**：針對目前的新聞資訊，分析並給出一到三個未來值得關注的產業，有機會成為下一個市場的焦點。
     4.  **分析與展望**：綜合所有資訊，提出你對短期{market_name}市場走勢的專業見解或潛在的觀察重點。
 
+    撰寫「關鍵公司動態」時，可參考以下依新聞提及次數統計的公司排行 (僅供參考，仍以新聞內容為準)：
+    {company_ranking}
+
     請確保你的分析完全基於我提供的文本，並以專業、客觀、條理分明的口吻撰寫，不過可以以有趣活潑的方法來敘事。
 
     --- 以下為新聞全文 ---
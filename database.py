@@ -1,16 +1,20 @@
 import sqlite3
 from datetime import datetime, timedelta
 
+# 導入自己的 entity_index 模組 (公司/代號提及索引)
+import entity_index
+
 # --- [全域常數] ---
 DB_FILE = "news.db"
+ARTICLE_COLUMNS = "id, headline, url, publish_time_str, publish_datetime, content, scraped_at"
 
 # --- [函數定義區] ---
 def setup_database():
-    """建立資料庫和 articles、summaries 表格 (如果不存在的話)。"""
+    """建立資料庫和 articles、article_markets、summaries、article_mentions 表格 (如果不存在的話)。"""
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
     
-    # 建立 articles 表格的完整指令
+    # 建立 articles 表格的完整指令 (與市場無關，同一個 url 只存一份，台股/美股共用)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS articles (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -19,10 +23,38 @@ def setup_database():
             publish_time_str TEXT,
             publish_datetime TEXT,
             content TEXT,
-            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            market TEXT
+            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 建立 article_markets 表格：記錄每篇文章出現在哪些市場的新聞列表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_markets (
+            article_id INTEGER NOT NULL,
+            market TEXT NOT NULL,
+            PRIMARY KEY (article_id, market)
         )
     ''')
+
+    # 舊版資料庫的 articles 表格帶有 market 欄位：把市場搬到 article_markets 後，
+    # 重建不含 market 欄位的 articles 表格，確保這段搬移只會執行一次
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(articles)")]
+    if 'market' in columns:
+        cursor.execute("INSERT OR IGNORE INTO article_markets (article_id, market) SELECT id, market FROM articles WHERE market IS NOT NULL")
+        cursor.execute('''
+            CREATE TABLE articles_migrated (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                headline TEXT NOT NULL,
+                url TEXT NOT NULL UNIQUE,
+                publish_time_str TEXT,
+                publish_datetime TEXT,
+                content TEXT,
+                scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute(f"INSERT INTO articles_migrated ({ARTICLE_COLUMNS}) SELECT {ARTICLE_COLUMNS} FROM articles")
+        cursor.execute("DROP TABLE articles")
+        cursor.execute("ALTER TABLE articles_migrated RENAME TO articles")
     
     # 建立 summaries 表格的完整指令
     cursor.execute('''
@@ -34,33 +66,111 @@ def setup_database():
             market TEXT
         )
     ''')
+
+    # 建立 article_mentions 表格：每篇文章提及各家公司的次數，於寫入文章時一併建立
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_mentions (
+            article_id INTEGER NOT NULL,
+            ticker TEXT NOT NULL,
+            mention_count INTEGER NOT NULL,
+            PRIMARY KEY (article_id, ticker)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_article_mentions_ticker ON article_mentions (ticker)")
     conn.commit()
     conn.close()
     print(f"資料庫 '{DB_FILE}' 已準備就緒。")
 
+def _insert_article(cursor, article_data, market):
+    """在既有的 cursor 上寫入一篇文章並登記市場，回傳這篇文章是否為此市場新加入的。"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO articles (headline, url, publish_time_str, publish_datetime, content)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (
+        article_data['headline'],
+        article_data['url'],
+        article_data.get('time_str', 'N/A'),
+        article_data.get('datetime').isoformat() if article_data.get('datetime') else None,
+        article_data.get('content')
+    ))
+    if cursor.rowcount > 0:
+        article_id = cursor.lastrowid
+        # 入庫時就掃描一次內文，分析時不必再重新比對全文
+        mentions = entity_index.count_mentions(article_data.get('content'))
+        cursor.executemany(
+            "INSERT INTO article_mentions (article_id, ticker, mention_count) VALUES (?, ?, ?)",
+            [(article_id, ticker, count) for ticker, count in mentions.items()]
+        )
+    else:
+        existing = cursor.execute("SELECT id FROM articles WHERE url = ?", (article_data['url'],)).fetchone()
+        if existing is None:
+            # INSERT OR IGNORE 也會略過違反 NOT NULL 等限制的資料，這時資料庫裡根本沒有這篇文章
+            print(f"資料庫錯誤: 文章資料不完整，無法寫入: {article_data.get('url')}")
+            return False
+        article_id = existing[0]
+
+    cursor.execute("INSERT OR IGNORE INTO article_markets (article_id, market) VALUES (?, ?)", (article_id, market))
+    return cursor.rowcount > 0
+
 def add_article(article_data, market):
+    """
+    將文章存入共用的 articles 表格，並登記到指定市場。
+    文章已被另一個市場存過時只新增市場關聯，不會被忽略。
+    回傳 True 代表這篇文章是此市場新加入的。
+    """
+    return add_articles([article_data], market) > 0
+
+def add_articles(articles, market):
+    """
+    以單一連線、單一交易批次寫入多篇文章，回傳此市場新加入的文章數。
+    每篇文章各自包在一個 SAVEPOINT 裡，某一篇寫入失敗只會回滾那一篇，不影響同批的其他文章。
+    """
     conn = sqlite3.connect(DB_FILE)
+    conn.isolation_level = None # 自行控制交易，SAVEPOINT 才不會被 sqlite3 模組自動開啟的交易干擾
     cursor = conn.cursor()
+    inserted_count = 0
     try:
-        cursor.execute('''
-            INSERT OR IGNORE INTO articles (headline, url, publish_time_str, publish_datetime, content, market)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            article_data['headline'],
-            article_data['url'],
-            article_data.get('time_str', 'N/A'),
-            article_data.get('datetime').isoformat() if article_data.get('datetime') else None,
-            article_data.get('content'),
-            market
-        ))
-        inserted = cursor.rowcount > 0
-        conn.commit()
+        cursor.execute("BEGIN")
+        for article_data in articles:
+            cursor.execute("SAVEPOINT add_article")
+            try:
+                inserted = _insert_article(cursor, article_data, market)
+            except sqlite3.Error as e:
+                print(f"資料庫錯誤: {e}")
+                cursor.execute("ROLLBACK TO add_article")
+                inserted = False
+            cursor.execute("RELEASE add_article")
+            inserted_count += inserted
+        cursor.execute("COMMIT")
     except sqlite3.Error as e:
         print(f"資料庫錯誤: {e}")
-        inserted = False
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        inserted_count = 0
     finally:
         conn.close()
-    return inserted
+    return inserted_count
+
+def get_cached_article(url):
+    """查詢共用文章庫中是否已有這個 url (例如另一個市場已經抓過)，有的話回傳文章內容，避免重複下載。"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM articles WHERE url = ?", (url,))
+    article = cursor.fetchone()
+    conn.close()
+    if article:
+        return dict(article)
+    return None
+
+def count_market_articles(market):
+    """計算目前登記在指定市場的文章數量"""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM article_markets WHERE market = ?", (market,))
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
 
 def get_all_articles_for_analysis(market):
     """
@@ -70,11 +180,53 @@ def get_all_articles_for_analysis(market):
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM articles WHERE market = ? ORDER BY publish_datetime DESC", (market,))
+    # 明確列出欄位，避免和 articles 表格的欄位撞名
+    article_columns = ", ".join(f"a.{column.strip()}" for column in ARTICLE_COLUMNS.split(","))
+    cursor.execute(f'''
+        SELECT {article_columns}, m.market
+        FROM articles a
+        JOIN article_markets m ON m.article_id = a.id
+        WHERE m.market = ?
+        ORDER BY a.publish_datetime DESC
+    ''', (market,))
     articles = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return articles
 
+def get_company_mentions(market, limit=None):
+    """
+    依公司彙整指定市場的提及次數，按「提及文章數、總提及次數」排序。
+    每筆結果包含 ticker、name、article_count、mention_count 與 article_ids。
+    """
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT m.ticker,
+               COUNT(*) AS article_count,
+               SUM(m.mention_count) AS mention_count,
+               GROUP_CONCAT(m.article_id) AS article_ids
+        FROM article_mentions m
+        JOIN article_markets am ON am.article_id = m.article_id
+        WHERE am.market = ?
+        GROUP BY m.ticker
+        ORDER BY article_count DESC, mention_count DESC
+        LIMIT ?
+    ''', (market, limit if limit is not None else -1)) # SQLite 的 LIMIT -1 代表不限制
+    rows = cursor.fetchall()
+    conn.close()
+
+    companies = []
+    for row in rows:
+        companies.append({
+            'ticker': row['ticker'],
+            'name': entity_index.get_company_name(row['ticker']),
+            'article_count': row['article_count'],
+            'mention_count': row['mention_count'],
+            'article_ids': [int(i) for i in row['article_ids'].split(',')]
+        })
+    return companies
+
 def add_summary(summary_text, source_article_count, market):
     """將一份新的 AI 分析報告存入資料庫"""
     conn = sqlite3.connect(DB_FILE)
@@ -104,12 +256,19 @@ def get_latest_summary(market):
     return None
 
 def clear_all_data(market):
-    """清空 articles 和 summaries 表格中的所有資料，為下一次運行做準備。"""
+    """
+    清空指定市場的資料，為下一次運行做準備。
+    共用的文章只移除此市場的關聯，仍被其他市場使用的文章會保留下來當作快取。
+    """
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
     try:
         # 使用 DELETE FROM 會清空表格內容，但保留表格結構
-        cursor.execute("DELETE FROM articles WHERE market = ?", (market,))
+        cursor.execute("DELETE FROM article_markets WHERE market = ?", (market,))
+        # 已經沒有任何市場使用的文章才真正刪除
+        orphaned = "SELECT id FROM articles WHERE id NOT IN (SELECT article_id FROM article_markets)"
+        cursor.execute(f"DELETE FROM article_mentions WHERE article_id IN ({orphaned})")
+        cursor.execute(f"DELETE FROM articles WHERE id IN ({orphaned})")
         cursor.execute("DELETE FROM summaries WHERE market = ?", (market,))
         conn.commit()
         print(f"資料庫 '{DB_FILE}' 已清空，準備接收新情報。")
@@ -0,0 +1,223 @@
+"""
+公司 / 股票代號提及索引。
+
+文章入庫時以 Aho-Corasick 自動機對內文掃描一次，統計每家公司被提及的次數。
+就這份字典的規模而言，純 Python 的自動機並不比逐一用 str.count 找每個別名快
+(實測 3.3KB 內文約 0.97ms 對 0.74ms)，保留它是因為單次掃描能拿到每個命中的位置：
+- 可以檢查英數字別名的單字邊界，以及數字代號前後的括號 / .TW 語境；
+- 重疊的別名 (例如「台積電ADR」與「台積電」) 可以依「最左最長」只算一次。
+逐一 count 的做法無法處理這兩點，會重複計算或誤判。每篇文章只在入庫時掃描一次，分析時直接查表。
+"""
+from collections import deque
+
+# --- [全域常數] ---
+# 內建的台股 / 美股公司字典: 代號 -> (公司名稱, [文章中可能出現的別名...])
+# 別名一律以小寫比對，英文別名前後不可緊鄰英數字 (避免 "AMD" 命中 "AMDX")
+# 純數字的股票代號必須出現在代號的語境中才算數，例如「(2330)」或「2330.TW」，避免「2002年」被當成中鋼
+# 較短的中文簡稱若會命中其他上市公司 (例如「長榮」也會命中長榮航)，就不列為別名，或把該公司也列入字典讓較長的名稱優先
+COMPANY_DICTIONARY = {
+    # --- 台股 ---
+    '2330': ('台積電', ['台積電', '台積', 'TSMC', '2330']),
+    '2317': ('鴻海', ['鴻海', '鴻海精密', '2317']),
+    '2454': ('聯發科', ['聯發科', 'MediaTek', '2454']),
+    '2308': ('台達電', ['台達電', '2308']),
+    '2382': ('廣達', ['廣達', '2382']),
+    '2303': ('聯電', ['聯電', 'UMC', '2303']),
+    '2412': ('中華電', ['中華電', '中華電信', '2412']),
+    '2881': ('富邦金', ['富邦金', '2881']),
+    '2882': ('國泰金', ['國泰金', '2882']),
+    '2891': ('中信金', ['中信金', '2891']),
+    '2886': ('兆豐金', ['兆豐金', '2886']),
+    '2884': ('玉山金', ['玉山金', '2884']),
+    '3711': ('日月光投控', ['日月光', '日月光投控', '3711']),
+    '2357': ('華碩', ['華碩', 'ASUS', '2357']),
+    '2353': ('宏碁', ['宏碁', 'Acer', '2353']),
+    '3231': ('緯創', ['緯創', '3231']),
+    '6669': ('緯穎', ['緯穎', '6669']),
+    '2376': ('技嘉', ['技嘉', '2376']),
+    '2345': ('智邦', ['智邦', '2345']),
+    '3008': ('大立光', ['大立光', '3008']),
+    '2379': ('瑞昱', ['瑞昱', '2379']),
+    '3034': ('聯詠', ['聯詠', '3034']),
+    '3661': ('世芯-KY', ['世芯', '3661']),
+    '3443': ('創意', ['創意電子', '3443']),
+    '5269': ('祥碩', ['祥碩', '5269']),
+    '2603': ('長榮', ['長榮海運', '2603']),
+    '2618': ('長榮航', ['長榮航', '長榮航空', '2618']),
+    '2609': ('陽明', ['陽明海運', '2609']),
+    '2615': ('萬海', ['萬海', '2615']),
+    '2002': ('中鋼', ['中鋼', '2002']),
+    '2013': ('中鋼構', ['中鋼構', '2013']),
+    '1301': ('台塑', ['台塑', '1301']),
+    '1303': ('南亞', ['南亞塑膠', '1303']),
+    '6505': ('台塑化', ['台塑化', '6505']),
+    '2207': ('和泰車', ['和泰車', '2207']),
+    '2912': ('統一超', ['統一超', '2912']),
+    '1216': ('統一', ['統一企業', '1216']),
+    '2344': ('華邦電', ['華邦電', '2344']),
+    '2408': ('南亞科', ['南亞科', '2408']),
+    '3037': ('欣興', ['欣興', '3037']),
+    '2327': ('國巨', ['國巨', '2327']),
+    '2301': ('光寶科', ['光寶科', '光寶', '2301']),
+    '2395': ('研華', ['研華', '2395']),
+    '4938': ('和碩', ['和碩', '4938']),
+    '2356': ('英業達', ['英業達', '2356']),
+    '3017': ('奇鋐', ['奇鋐', '3017']),
+    '3324': ('雙鴻', ['雙鴻', '3324']),
+    '1519': ('華城', ['華城', '1519']),
+    '1513': ('中興電', ['中興電', '1513']),
+    '0050': ('元大台灣50', ['元大台灣50', '0050']),
+    '0056': ('元大高股息', ['元大高股息', '0056']),
+    '00878': ('國泰永續高股息', ['國泰永續高股息', '00878']),
+    # --- 美股 ---
+    'AAPL': ('Apple', ['蘋果', 'Apple', 'AAPL']),
+    'MSFT': ('Microsoft', ['微軟', 'Microsoft', 'MSFT']),
+    'NVDA': ('NVIDIA', ['輝達', 'NVIDIA', 'NVDA', '英偉達']),
+    'GOOGL': ('Alphabet', ['谷歌', 'Google', 'Alphabet', 'GOOGL', 'GOOG']),
+    'AMZN': ('Amazon', ['亞馬遜', 'Amazon', 'AMZN']),
+    'META': ('Meta', ['Meta', 'Facebook', '臉書']),
+    'TSLA': ('Tesla', ['特斯拉', 'Tesla', 'TSLA']),
+    'AVGO': ('Broadcom', ['博通', 'Broadcom', 'AVGO']),
+    'AMD': ('AMD', ['超微', 'AMD']),
+    'INTC': ('Intel', ['英特爾', 'Intel', 'INTC']),
+    'QCOM': ('Qualcomm', ['高通', 'Qualcomm', 'QCOM']),
+    'MU': ('Micron', ['美光', 'Micron']),
+    'ARM': ('Arm', ['安謀', 'Arm Holdings']),
+    'SMCI': ('Super Micro', ['美超微', 'Supermicro', 'Super Micro', 'SMCI']),
+    'ORCL': ('Oracle', ['甲骨文', 'Oracle', 'ORCL']),
+    'CRM': ('Salesforce', ['Salesforce']),
+    'ADBE': ('Adobe', ['Adobe', 'ADBE']),
+    'NFLX': ('Netflix', ['網飛', 'Netflix', 'NFLX']),
+    'PLTR': ('Palantir', ['Palantir', 'PLTR']),
+    'COIN': ('Coinbase', ['Coinbase']),
+    'JPM': ('JPMorgan Chase', ['摩根大通', '小摩', 'JPMorgan', 'JPM']),
+    'GS': ('Goldman Sachs', ['高盛', 'Goldman Sachs']),
+    'MS': ('Morgan Stanley', ['摩根士丹利', '大摩', 'Morgan Stanley']),
+    'BAC': ('Bank of America', ['美國銀行', 'Bank of America']),
+    'BRK.B': ('Berkshire Hathaway', ['波克夏', 'Berkshire']),
+    'V': ('Visa', ['Visa']),
+    'MA': ('Mastercard', ['萬事達卡', 'Mastercard']),
+    'WMT': ('Walmart', ['沃爾瑪', 'Walmart', 'WMT']),
+    'COST': ('Costco', ['好市多', 'Costco']),
+    'KO': ('Coca-Cola', ['可口可樂', 'Coca-Cola']),
+    'MCD': ('McDonald\'s', ['麥當勞', 'McDonald']),
+    'NKE': ('Nike', ['耐吉', 'Nike', 'NKE']),
+    'DIS': ('Disney', ['迪士尼', 'Disney']),
+    'BA': ('Boeing', ['波音', 'Boeing']),
+    'XOM': ('Exxon Mobil', ['埃克森美孚', 'Exxon', 'XOM']),
+    'CVX': ('Chevron', ['雪佛龍', 'Chevron', 'CVX']),
+    'LLY': ('Eli Lilly', ['禮來', 'Eli Lilly', 'Lilly']),
+    'NVO': ('Novo Nordisk', ['諾和諾德', 'Novo Nordisk']),
+    'PFE': ('Pfizer', ['輝瑞', 'Pfizer', 'PFE']),
+    'UNH': ('UnitedHealth', ['聯合健康', 'UnitedHealth', 'UNH']),
+    'ASML': ('ASML', ['艾司摩爾', 'ASML']),
+    'TSM': ('TSMC ADR', ['台積電ADR', '台積ADR']),
+    'UBER': ('Uber', ['Uber']),
+    'SPY': ('SPDR S&P 500 ETF', ['SPY']),
+    'QQQ': ('Invesco QQQ', ['QQQ']),
+}
+
+
+# --- [函數定義區] ---
+def _is_word_char(ch):
+    """英數字視為「單字」的一部分，用來判斷英文/數字別名的邊界。"""
+    return ch.isascii() and ch.isalnum()
+
+
+def _has_ticker_context(lowered, start, end):
+    """純數字代號前後必須是括號，或緊接著 .TW / .TWO 後綴，才視為股票代號。"""
+    if start > 0 and lowered[start - 1] in '(（' and end < len(lowered) and lowered[end] in ')）':
+        return True
+    return lowered.startswith('.tw', end)
+
+
+def build_automaton(dictionary=COMPANY_DICTIONARY):
+    """
+    以公司字典建立 Aho-Corasick 自動機。
+    回傳 (goto, fail, output)，三者皆以節點編號為索引：
+    goto[node] 是 {字元: 下一個節點}，output[node] 是 [(別名長度, 代號), ...]。
+    """
+    goto, fail, output = [{}], [0], [[]]
+    for ticker, (_name, aliases) in dictionary.items():
+        for alias in aliases:
+            node = 0
+            for ch in alias.lower():
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    output.append([])
+                node = nxt
+            if (len(alias), ticker) not in output[node]:
+                output[node].append((len(alias), ticker))
+
+    # 以 BFS 建立失敗連結，並把失敗節點的輸出合併進來，掃描時就不用再沿著 fail 鏈找
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for ch, nxt in goto[node].items():
+            queue.append(nxt)
+            state = fail[node]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            fail[nxt] = goto[state].get(ch, 0)
+            output[nxt] = output[nxt] + output[fail[nxt]]
+    return goto, fail, output
+
+
+_DEFAULT_AUTOMATON = None
+
+def get_default_automaton():
+    """內建字典的自動機只建一次，之後重複使用。"""
+    global _DEFAULT_AUTOMATON
+    if _DEFAULT_AUTOMATON is None:
+        _DEFAULT_AUTOMATON = build_automaton()
+    return _DEFAULT_AUTOMATON
+
+
+def count_mentions(text, automaton=None):
+    """
+    單次掃描文章內文，回傳 {代號: 提及次數}。
+    重疊的命中採「最左最長」原則，例如「台積電ADR」只算 TSM，不會再算一次 2330。
+    """
+    if not text:
+        return {}
+    goto, fail, output = automaton or get_default_automaton()
+    lowered = text.lower()
+
+    matches = []
+    node = 0
+    for end, ch in enumerate(lowered, 1):
+        while node and ch not in goto[node]:
+            node = fail[node]
+        node = goto[node].get(ch, 0)
+        for length, ticker in output[node]:
+            start = end - length
+            # 英文/數字別名必須落在單字邊界上
+            if _is_word_char(lowered[start]) and start > 0 and _is_word_char(lowered[start - 1]):
+                continue
+            if _is_word_char(lowered[end - 1]) and end < len(lowered) and _is_word_char(lowered[end]):
+                continue
+            is_code = lowered[start:end].isdigit()
+            if is_code and not _has_ticker_context(lowered, start, end):
+                continue
+            matches.append((start, end, ticker, is_code))
+
+    counts = {}
+    last_end, last_ticker = 0, None
+    for start, end, ticker, is_code in sorted(matches, key=lambda m: (m[0], -m[1])):
+        if start < last_end:
+            continue
+        # 「台積電(2330)」是同一次提及，緊跟在公司名稱後面的代號不重複計算
+        if not (is_code and ticker == last_ticker and start == last_end + 1):
+            counts[ticker] = counts.get(ticker, 0) + 1
+        last_end, last_ticker = end, ticker
+    return counts
+
+
+def get_company_name(ticker):
+    """由代號查詢字典中的公司名稱，查不到就回傳代號本身。"""
+    entry = COMPANY_DICTIONARY.get(ticker)
+    return entry[0] if entry else ticker
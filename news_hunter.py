@@ -5,6 +5,7 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 import time
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from datetime import datetime, timedelta, timezone
 import re
 import requests
@@ -15,6 +16,8 @@ import argparse
 HOURS_TO_FETCH = 24
 SCROLLING_MAX_RETRIES = 3 # 滾動失敗時，最多重試幾次
 RETRY_DELAY_SECONDS = 60
+TIME_KEYWORDS = ['前', '小時', '分鐘', '昨天'] # 列表上的相對時間文字
+DB_BATCH_SIZE = 10 # 每累積幾篇文章就批次寫入資料庫一次
 
 MARKET_CONFIG = {
     'TW': {
@@ -48,6 +51,36 @@ def parse_yahoo_time(time_str, time_now):
         return time_now - timedelta(days=1)
     return None
 
+def parse_article_html(html):
+    """
+    從文章頁面的 HTML 解析出精確時間和內文，解析完立刻釋放 soup。
+    只要有一項沒抓到，就返回 None, None。
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    publish_time = None
+    content = ""
+
+    # 抓取精確時間 (通常在 <time> 標籤的 datetime 屬性中)
+    time_tag = soup.select_one('time[datetime]')
+    if time_tag:
+        iso_timestamp = time_tag['datetime']
+        # fromisoformat 會直接把標準 ISO 格式轉成有時區的 datetime 物件
+        # Z 代表 UTC+0，我們把它轉成 +00:00 讓 Python 能解析
+        publish_time = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
+
+    # 抓取內文
+    article_body = soup.select_one('article')
+    if article_body:
+        paragraphs = [p.text for p in article_body.find_all('p')]
+        content = "\n".join(paragraphs)
+
+    # BeautifulSoup 的節點彼此互相參照，decompose() 才能讓整棵樹馬上被回收
+    soup.decompose()
+
+    if not publish_time or not content:
+        return None, None
+    return publish_time, content
+
 def scrape_article_details(url):
     """
     抓取精確時間和內文。如果失敗，則直接返回 None, None 來觸發主程式的錯誤處理。
@@ -56,24 +89,7 @@ def scrape_article_details(url):
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
         response = requests.get(url, headers=headers, timeout=15)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        publish_time = None
-        content = ""
-
-        # 抓取精確時間 (通常在 <time> 標籤的 datetime 屬性中)
-        time_tag = soup.select_one('time[datetime]')
-        if time_tag:
-            iso_timestamp = time_tag['datetime']
-            # fromisoformat 會直接把標準 ISO 格式轉成有時區的 datetime 物件
-            # Z 代表 UTC+0，我們把它轉成 +00:00 讓 Python 能解析
-            publish_time = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
-
-        # 抓取內文
-        article_body = soup.select_one('article')
-        if article_body:
-            paragraphs = [p.text for p in article_body.find_all('p')]
-            content = "\n".join(paragraphs)
+        publish_time, content = parse_article_html(response.text)
 
         # 只要有一項沒抓到，就視為失敗
         if not publish_time or not content:
@@ -86,6 +102,164 @@ def scrape_article_details(url):
         print(f"  [錯誤] 抓取頁面失敗: {url}, 原因: {e}")
         return None, None
 
+# --- [串流處理管線] ---
+# 列表 -> 抓取/解析 -> 時間過濾 -> 批次寫入資料庫，每一段都是產生器，
+# 同一時間只有一篇文章在管線中流動，記憶體用量不會隨 HOURS_TO_FETCH 變大而增加。
+class NewsListParser(HTMLParser):
+    """
+    以串流方式解析列表頁，取出每個 #YDC-Stream-Proxy li 裡第一個 h3 a 的標題與網址。
+    同時記下新聞則數，以及第一則 / 最後一則新聞標題前的相對時間 (例如「3 小時前」)，供智慧滾動判斷。
+    不建立整棵 DOM 樹，列表再長，記憶體中也只有 (標題, 網址) 這兩個字串。
+    """
+    def __init__(self):
+        super().__init__()
+        self.news_list = []
+        self._container_tag = None # #YDC-Stream-Proxy 的標籤名稱，用來判斷何時離開容器
+        self._container_depth = 0
+        self._li_depth = 0
+        self._h3_depth = 0
+        self._item_done = False    # 每個 li 只取第一個 h3 a
+        self._link = None          # 正在收集文字的 <a>: (href, 文字片段)
+        self._span_depth = 0
+        self._span_texts = []      # 標題前的 <span> 文字片段
+        self._item_time_text = None
+        self.item_count = 0        # 容器內的 li 數量
+        self.first_time_text = None
+        self.last_time_text = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._container_tag is None:
+            if dict(attrs).get('id') == 'YDC-Stream-Proxy':
+                self._container_tag, self._container_depth = tag, 1
+            return
+        if tag == self._container_tag:
+            self._container_depth += 1
+        if tag == 'li':
+            if self._li_depth == 0:
+                self._item_done = False
+                self._item_time_text = None
+            self._li_depth += 1
+            self.item_count += 1
+        elif tag == 'span' and self._li_depth and not self._h3_depth and not self._item_done:
+            # 時間放在標題前面的 <span> 裡
+            if self._span_depth == 0:
+                self._span_texts = []
+            self._span_depth += 1
+        elif tag == 'h3' and self._li_depth:
+            self._h3_depth += 1
+        elif tag == 'a' and self._h3_depth and not self._item_done:
+            self._item_done = True
+            self._link = (dict(attrs).get('href'), [])
+            if self._item_time_text:
+                if self.first_time_text is None:
+                    self.first_time_text = self._item_time_text
+                self.last_time_text = self._item_time_text
+
+    def handle_endtag(self, tag):
+        if self._container_tag is None:
+            return
+        if tag == 'a' and self._link is not None:
+            href, texts = self._link
+            self._link = None
+            if href:
+                self.news_list.append((''.join(texts).strip(), href))
+        elif tag == 'span' and self._span_depth:
+            self._span_depth -= 1
+            text = ''.join(self._span_texts).strip()
+            if self._item_time_text is None and any(kw in text for kw in TIME_KEYWORDS):
+                self._item_time_text = text
+        elif tag == 'h3' and self._h3_depth:
+            self._h3_depth -= 1
+        elif tag == 'li' and self._li_depth:
+            self._li_depth -= 1
+        if tag == self._container_tag:
+            self._container_depth -= 1
+            if self._container_depth == 0:
+                self._container_tag = None
+
+    def handle_data(self, data):
+        if self._link is not None:
+            self._link[1].append(data)
+        if self._span_depth:
+            self._span_texts.append(data)
+
+def scan_news_list_times(page_source, time_now):
+    """
+    智慧滾動用：以串流方式掃描目前的列表頁，回傳 (新聞則數, 最新新聞時間, 最舊新聞時間)。
+    不建立 BeautifulSoup 樹，每次滾動的記憶體用量不會隨列表變長而增加。
+    """
+    parser = NewsListParser()
+    parser.feed(page_source)
+    parser.close()
+    newest_time = parse_yahoo_time(parser.first_time_text, time_now) if parser.first_time_text else None
+    oldest_time = parse_yahoo_time(parser.last_time_text, time_now) if parser.last_time_text else None
+    return parser.item_count, newest_time, oldest_time
+
+def iter_news_list(page_source, stats):
+    """
+    從列表頁 HTML 取出每則新聞的標題與網址。
+    解析時不建立 DOM 樹，解析完就放掉對原始碼的參照，之後管線中只剩 (標題, 網址) 清單。
+    """
+    parser = NewsListParser()
+    parser.feed(page_source)
+    parser.close()
+    del page_source
+    news_list = parser.news_list
+
+    stats['listed'] = len(news_list)
+    print(f"\n列表分析完成，共 {len(news_list)} 個目標。開始逐一潛入進行精準時間過濾...")
+    for headline, url in news_list:
+        if not url.startswith('http'):
+            url = "https://tw.stock.yahoo.com" + url
+        yield {"headline": headline, "url": url}
+
+def iter_article_details(news_items, stats):
+    """逐篇取得精確時間與內文；共用文章庫已有的文章 (另一個市場抓過) 直接沿用，不再下載。"""
+    for news in news_items:
+        cached_article = database.get_cached_article(news['url'])
+        if cached_article and cached_article['publish_datetime'] and cached_article['content']:
+            publish_time = datetime.fromisoformat(cached_article['publish_datetime'])
+            content = cached_article['content']
+            stats['saved_fetches'] += 1
+        else:
+            publish_time, content = scrape_article_details(news['url'])
+
+        if not publish_time or not content:
+            print(f"\n[FATAL ERROR] 無法抓取文章 '{news['headline']}' 的完整內容。程式終止。")
+            continue
+
+        yield {
+            "headline": news['headline'],
+            "url": news['url'],
+            "time_str": publish_time.strftime('%Y-%m-%d %H:%M:%S %Z'),
+            "datetime": publish_time,
+            "content": content
+        }
+
+def filter_time_window(articles, time_window, recent_urls=None):
+    """只放行發佈時間落在 time_window 之後的文章；有傳入 recent_urls 時，順便記下放行文章的網址"""
+    for article_data in articles:
+        # 這裡現在是兩個 aware time 在做比較，非常精準
+        if article_data['datetime'] >= time_window:
+            if recent_urls is not None:
+                recent_urls.add(article_data['url'])
+            formatted_time = article_data['datetime'].strftime('%Y-%m-%d %H:%M')
+            print(f"Time:{formatted_time}\nheadline:{article_data['headline']}")
+            yield article_data
+
+def write_articles_in_batches(articles, market, batch_size=DB_BATCH_SIZE):
+    """每累積 batch_size 篇就寫入資料庫一次，緩衝區最多只保留 batch_size 篇文章。回傳新增的文章數。"""
+    new_articles_count = 0
+    batch = []
+    for article_data in articles:
+        batch.append(article_data)
+        if len(batch) >= batch_size:
+            new_articles_count += database.add_articles(batch, market)
+            batch = []
+    if batch:
+        new_articles_count += database.add_articles(batch, market)
+    return new_articles_count
+
 def main():
     parser = argparse.ArgumentParser(description="抓取指定市場的財經新聞。")
     parser.add_argument("--market", type=str, required=True, choices=['TW', 'US'])
@@ -96,6 +270,9 @@ def main():
     # 確保資料庫結構存在並清空舊資料
     database.setup_database()
     database.clear_all_data(market)
+    # 記下另一個市場目前的文章數，任務結束時確認共用文章沒有被這次執行刪掉
+    other_market = 'US' if market == 'TW' else 'TW'
+    other_count_before = database.count_market_articles(other_market)
 
     # 在程式一開始，就定義一個統一的、帶有時區的「現在時間」基準點
     now_utc = datetime.now(timezone.utc)
@@ -146,23 +323,9 @@ def main():
                 time.sleep(10)
                 new_height = driver.execute_script("return document.body.scrollHeight")
                 
-                temp_soup = BeautifulSoup(driver.page_source, 'html.parser')
-                news_items = temp_soup.select('#YDC-Stream-Proxy li')
-                last_news_time = None
-                for item in reversed(news_items):
-                    h3_tag = item.select_one('h3 a')
-                    if h3_tag:
-                        time_div = h3_tag.find_parent('h3').find_previous_sibling('div')
-                        if time_div:
-                            for span in time_div.find_all('span'):
-                                text = span.text.strip()
-                                if any(kw in text for kw in ['前', '小時', '分鐘', '昨天']):
-                                    # 將 UTC 基準時間傳給 parse_yahoo_time
-                                    # parse_yahoo_time 回傳的時間也會是 UTC aware
-                                    last_news_time = parse_yahoo_time(text, now_utc)
-                                    break
-                        if last_news_time:
-                            break
+                # 只需要新聞則數與最新 / 最舊的時間，以串流方式掃描，不建立整頁的 soup
+                # last_news_time 由 parse_yahoo_time 回傳，同樣是 UTC aware
+                article_count, newest_time, last_news_time = scan_news_list_times(driver.page_source, now_utc)
                 
                 if last_news_time and last_news_time < time_window:
                     print(f"偵測到最舊新聞已超出 {HOURS_TO_FETCH} 小時範圍，停止滾動。")
@@ -171,28 +334,8 @@ def main():
                 
                 if new_height == last_height:
                     print("已達頁面底部，進行最終條件檢查...")
+                    oldest_time = last_news_time
 
-                    # 取得當前頁面上所有新聞的列表
-                    final_news_items = temp_soup.select('#YDC-Stream-Proxy li')
-                    article_count = len(final_news_items)
-
-                    # 取得最舊與最新的新聞時間
-                    oldest_time = last_news_time # last_news_time 是我們在迴圈中持續更新的最舊時間
-                    newest_time = None
-                    
-                    # 從頭部開始尋找，找到的第一個就是最新的時間
-                    for item in final_news_items:
-                        h3_tag = item.select_one('h3 a')
-                        if h3_tag:
-                            time_div = h3_tag.find_parent('h3').find_previous_sibling('div')
-                            if time_div:
-                                for span in time_div.find_all('span'):
-                                    text = span.text.strip()
-                                    if any(kw in text for kw in ['前', '小時', '分鐘', '昨天']):
-                                        newest_time = parse_yahoo_time(text, now_utc)
-                                        break # 找到第一個就跳出
-                            if newest_time: break
-                    
                     # 計算時間跨度 (小時)
                     time_span_hours = 0
                     if newest_time and oldest_time:
@@ -229,46 +372,14 @@ def main():
         sys.exit(1) # 使用非 0 的 exit code 代表錯誤
 
     print("\n開始分析與抓取詳細內容...")
-    # 處理資料：使用統一的 UTC 時間基準進行精準過濾
-    soup = BeautifulSoup(page_source, 'html.parser')
-    news_to_process = []
-    for item in soup.select('#YDC-Stream-Proxy li'):
-        headline_tag = item.select_one('h3 a')
-        if headline_tag and headline_tag.get('href'):
-            url = headline_tag.get('href')
-            if not url.startswith('http'):
-                url = "https://tw.stock.yahoo.com" + url
-            news_to_process.append({
-                "headline": headline_tag.text.strip(),
-                "url": url
-            })
-
-    print(f"\n列表分析完成，共 {len(news_to_process)} 個目標。開始逐一潛入進行精準時間過濾...")
-    
-    # 精準過濾的時間窗口，也從同一個 time_window 計算
-    new_articles_count = 0
-    
-    for news in news_to_process:
-        publish_time, content = scrape_article_details(news['url'])
-
-        if not publish_time or not content:
-            print(f"\n[FATAL ERROR] 無法抓取文章 '{news['headline']}' 的完整內容。程式終止。")
-            continue
-        
-        # 這裡現在是兩個 aware time 在做比較，非常精準
-        if publish_time and content and publish_time >= time_window:
-            article_data = {
-                "headline": news['headline'],
-                "url": news['url'],
-                "time_str": publish_time.strftime('%Y-%m-%d %H:%M:%S %Z'),
-                "datetime": publish_time,
-                "content": content
-            }
-            formatted_time = article_data['datetime'].strftime('%Y-%m-%d %H:%M')
-            print(f"Time:{formatted_time}\nheadline:{article_data['headline']}")
-
-            if database.add_article(article_data, market):
-                new_articles_count += 1
+    # 串接處理管線：列表 -> 抓取/解析 -> 精準時間過濾 (使用同一個 time_window) -> 批次寫入
+    stats = {'listed': 0, 'saved_fetches': 0}
+    news_items = iter_news_list(page_source, stats)
+    page_source = None # 原始碼只交給管線使用，這裡不再保留參照
+    articles = iter_article_details(news_items, stats)
+    recent_urls = set()
+    recent_articles = filter_time_window(articles, time_window, recent_urls)
+    new_articles_count = write_articles_in_batches(recent_articles, market)
 
     if new_articles_count <= 1:
         print(f"[FATAL ERROR] 抓取新聞可能有問題，參考新聞只有{new_articles_count}篇。")
@@ -276,9 +387,21 @@ def main():
     
     print("\n--- 任務報告 ---")
     if new_articles_count == 0:
-        print(f"[FATAL ERROR] 處理了 {len(news_to_process)} 個目標，但沒有任何一篇符合條件或為新文章。可能出現問題，程式終止。")
+        print(f"[FATAL ERROR] 處理了 {stats['listed']} 個目標，但沒有任何一篇符合條件或為新文章。可能出現問題，程式終止。")
         sys.exit(1) # 使用非 0 的 exit code 代表錯誤
     print(f"✔️ 本次新增 {new_articles_count} 篇符合精準時間的新文章到知識庫。")
+    print(f"♻️ 共用文章庫省下 {stats['saved_fetches']}/{stats['listed']} 次文章下載。")
+
+    # 確認通過時間篩選的每個網址都確實登記在此市場 (包含直接沿用其他市場快取的文章)
+    stored_count = database.count_market_articles(market)
+    if stored_count != len(recent_urls):
+        print(f"[FATAL ERROR] {market} 市場應有 {len(recent_urls)} 篇文章，資料庫中卻只有 {stored_count} 篇。")
+        sys.exit(1) # 使用非 0 的 exit code 代表錯誤
+    # 確認另一個市場的文章沒有因為共用文章庫而被刪掉
+    other_count_after = database.count_market_articles(other_market)
+    if other_count_after < other_count_before:
+        print(f"[FATAL ERROR] {other_market} 市場原有 {other_count_before} 篇文章，執行後只剩 {other_count_after} 篇。")
+        sys.exit(1) # 使用非 0 的 exit code 代表錯誤
 
 # --- [程式總開關] ---
 if __name__ == "__main__":
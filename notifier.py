@@ -1,27 +1,200 @@
 import os
 import re
+import json
 from telegraph import Telegraph
 import requests
 
-def markdown_to_html(md_text):
-    """將簡單的 Markdown 語法轉換為 Telegraph 支援的 HTML"""
-    # 1. 處理粗體: **文字** -> <b>文字</b>
-    html = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', md_text)
-    
-    # 2. 處理標題 (###): ### 標題 -> <h3>標題</h3>
-    # Telegraph 支援 h3 和 h4
-    html = re.sub(r'^###\s+(.*)', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    
-    # 3. 處理標題 (##): ## 標題 -> <h3>標題</h3>
-    html = re.sub(r'^##\s+(.*)', r'<h3>\1</h3>', html, flags=re.MULTILINE)
+# --- [全域常數] ---
+# Telegraph 單頁內容 (節點 JSON) 上限為 64KB，保留一些空間給頁尾的「下一頁」連結
+TELEGRAPH_PAGE_BYTE_LIMIT = 60 * 1024
 
-    # 4. 處理換行: \n -> <br>
-    # 注意：Telegraph 的 <br> 處理有時比較嚴格，多個 \n 可以轉成 <p>
-    html = html.replace('\n', '<br>')
-    
-    return html
+TELEGRAM_API_BASE = "https://api.telegram.org"
+# Telegram Bot API 透過 multipart 上傳檔案的上限
+TELEGRAM_UPLOAD_BYTE_LIMIT = 50 * 1024 * 1024
+
+RE_BOLD = re.compile(r'\*\*(.*?)\*\*')
+RE_HEADING = re.compile(r'^(#{2,4})\s+(.*)')
+RE_BULLET_ITEM = re.compile(r'^\s*[-*+]\s+(.*)')
+RE_ORDERED_ITEM = re.compile(r'^\s*(\d+)[.)]\s+(.*)')
+RE_WHITESPACE = re.compile(r'\s+')
+
+# --- [函數定義區] ---
+def _inline_nodes(text):
+    """處理單行內的粗體: **文字** -> {'tag': 'b'}，其餘為純文字 (空白比照 Telegraph 壓成單一空格)"""
+    text = RE_WHITESPACE.sub(' ', text).strip()
+    nodes, pos = [], 0
+    for match in RE_BOLD.finditer(text):
+        if match.start() > pos:
+            nodes.append(text[pos:match.start()])
+        if match.group(1):
+            nodes.append({'tag': 'b', 'children': [match.group(1)]})
+        pos = match.end()
+    if pos < len(text):
+        nodes.append(text[pos:])
+    return nodes
+
+def markdown_to_nodes(md_text):
+    """
+    將簡單的 Markdown 語法一次掃描轉換為 Telegraph 節點 (content JSON)，不再經過 HTML。
+    支援段落 (空行分段、段內換行轉 <br>)、## / ### 標題 (h3)、#### 標題 (h4)、粗體與清單；
+    有序清單項目底下縮排的子清單與說明文字會放進該項目裡，不會中斷編號。
+    """
+    nodes = []
+    block = None          # 目前正在累積的段落或清單節點
+    ordered_list = None   # 目前開啟中的有序清單，縮排的子清單與空行都不會結束它
+    next_number = None    # 有序清單下一個應出現的編號
+
+    for line in md_text.splitlines():
+        if not line.strip():
+            block = None
+            continue
+        indented = line[0].isspace()
+
+        heading = RE_HEADING.match(line)
+        if heading:
+            # Telegraph 只支援 h3 和 h4
+            tag = 'h4' if len(heading.group(1)) == 4 else 'h3'
+            nodes.append({'tag': tag, 'children': _inline_nodes(heading.group(2))})
+            block = ordered_list = None
+            continue
+
+        bullet = RE_BULLET_ITEM.match(line)
+        ordered = RE_ORDERED_ITEM.match(line)
+        if bullet:
+            if indented and ordered_list:
+                # 有序清單項目底下縮排的子清單，放進最後一個 <li> 裡
+                parent = ordered_list['children'][-1]['children']
+                if not parent or isinstance(parent[-1], str) or parent[-1]['tag'] != 'ul':
+                    parent.append({'tag': 'ul', 'children': []})
+                parent[-1]['children'].append({'tag': 'li', 'children': _inline_nodes(bullet.group(1))})
+                block = parent[-1]
+                continue
+            ordered_list = None
+            if not block or block['tag'] != 'ul':
+                block = {'tag': 'ul', 'children': []}
+                nodes.append(block)
+            block['children'].append({'tag': 'li', 'children': _inline_nodes(bullet.group(1))})
+            continue
+        if ordered:
+            number = int(ordered.group(1))
+            # Telegraph 的 <ol> 一律從 1 開始編號，接不上的編號就保留原文，避免顯示錯誤的序號
+            if ordered_list and number == next_number:
+                next_number += 1
+                ordered_list['children'].append({'tag': 'li', 'children': _inline_nodes(ordered.group(2))})
+                block = ordered_list
+                continue
+            if number == 1:
+                ordered_list = block = {'tag': 'ol', 'children': []}
+                nodes.append(block)
+                next_number = 2
+                block['children'].append({'tag': 'li', 'children': _inline_nodes(ordered.group(2))})
+                continue
+
+        if indented and ordered_list and not ordered:
+            # 有序清單項目底下縮排的說明文字，接在最後一個 <li> 後面
+            ordered_list['children'][-1]['children'].extend([{'tag': 'br'}] + _inline_nodes(line.strip()))
+            continue
+
+        ordered_list = None
+        if not block or block['tag'] != 'p':
+            block = {'tag': 'p', 'children': []}
+            nodes.append(block)
+        elif block['children']:
+            block['children'].append({'tag': 'br'})
+        block['children'].extend(_inline_nodes(line))
+
+    # 比照 Telegraph 的 HTML 解析結果，空的節點不帶 children
+    for node in nodes:
+        if not node['children']:
+            node.pop('children')
+    return nodes
+
+def _node_size(node):
+    """節點序列化後的位元組數 (與 telegraph 套件送出的 JSON 格式相同)"""
+    return len(json.dumps(node, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+def _split_oversized_node(node, limit):
+    """把單一個超過上限的區塊，依子節點切成多個同類型的區塊；單一長字串則直接依字數切開。"""
+    if isinstance(node, str):
+        step = max(1, limit // 4)  # UTF-8 中文字最多 3 bytes，再保留 JSON 跳脫字元的空間
+        return [node[i:i + step] for i in range(0, len(node), step)]
+    if not node.get('children'):
+        return [node]
+
+    parts, current, current_size = [], [], 0
+    overhead = _node_size({'tag': node['tag'], 'children': []})
+    for child in node['children']:
+        for piece in _split_oversized_node(child, limit - overhead):
+            size = _node_size(piece) + 1
+            if current and overhead + current_size + size > limit:
+                parts.append({'tag': node['tag'], 'children': current})
+                current, current_size = [], 0
+            current.append(piece)
+            current_size += size
+    if current:
+        parts.append({'tag': node['tag'], 'children': current})
+    return parts
+
+def split_nodes_into_pages(nodes, limit=TELEGRAPH_PAGE_BYTE_LIMIT):
+    """依 Telegraph 單頁大小上限，把節點清單切成多頁；區塊盡量保持完整，過大的區塊才拆開。"""
+    pages, current, current_size = [], [], 2  # 2 = 外層 [] 的大小
+    for node in nodes:
+        pieces = [node] if _node_size(node) + 3 <= limit else _split_oversized_node(node, limit - 3)
+        for piece in pieces:
+            size = _node_size(piece) + 1
+            if current and current_size + size > limit:
+                pages.append(current)
+                current, current_size = [], 2
+            current.append(piece)
+            current_size += size
+    if current or not pages:
+        pages.append(current)
+    return pages
+
+def publish_to_telegraph(tg, title, nodes, author_name):
+    """
+    發佈報告到 Telegraph，超過單頁上限時自動分頁。
+    從最後一頁開始建立，每一頁的結尾都附上前往下一頁的連結，回傳第一頁的網址。
+    """
+    pages = split_nodes_into_pages(nodes)
+    next_url = None
+    for index in range(len(pages), 0, -1):
+        content = pages[index - 1]
+        page_title = title if len(pages) == 1 else f"{title} ({index}/{len(pages)})"
+        if next_url:
+            content = content + [{'tag': 'p', 'children': [
+                {'tag': 'a', 'attrs': {'href': next_url}, 'children': [f"下一頁 ({index + 1}/{len(pages)}) →"]}
+            ]}]
+        response = tg.create_page(title=page_title, content=content, author_name=author_name)
+        next_url = response['url']
+    if len(pages) > 1:
+        print(f"報告超過 Telegraph 單頁上限，已自動分成 {len(pages)} 頁。")
+    return next_url
+
+def send_audio_files(token, chat_id, audio_paths, market_name):
+    """
+    依序上傳音檔，上傳前先確認檔案大小。
+    Ogg/Opus 以語音訊息 (sendVoice) 發送，其他格式以音樂檔 (sendAudio) 發送。
+    """
+    if not audio_paths:
+        print("❌ 沒有可上傳的音檔。")
+        return
+    for part, audio_path in enumerate(audio_paths, 1):
+        file_size = os.path.getsize(audio_path)
+        if file_size > TELEGRAM_UPLOAD_BYTE_LIMIT:
+            print(f"❌ 音檔 {audio_path} 大小 {file_size / 1024 / 1024:.2f} MB 超過 Telegram 上傳上限，略過。")
+            continue
+
+        caption = f"🎧 {market_name}新聞摘要Podcast"
+        if len(audio_paths) > 1:
+            caption += f" ({part}/{len(audio_paths)})"
+
+        method, field = ('sendVoice', 'voice') if audio_path.endswith('.ogg') else ('sendAudio', 'audio')
+        url_audio = f"{TELEGRAM_API_BASE}/bot{token}/{method}"
+        with open(audio_path, 'rb') as audio:
+            requests.post(url_audio, data={'chat_id': chat_id, 'caption': caption}, files={field: audio})
 
-def send_to_telegram(md_path, mp3_path, market_name):
+def send_to_telegram(md_path, audio_paths, market_name):
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
     
@@ -29,24 +202,24 @@ def send_to_telegram(md_path, mp3_path, market_name):
         md_content = f.read()
 
     # 語法轉換
-    html_content = markdown_to_html(md_content)
+    content_nodes = markdown_to_nodes(md_content)
 
     # --- [Step 1: 建立 Telegraph 文章] ---
     tg = Telegraph()
     tg.create_account(short_name='LazyNewsAI')
     
-    response = tg.create_page(
+    report_url = publish_to_telegraph(
+        tg,
         title=f"{market_name}新聞摘要",
-        html_content=f"<p>{html_content}</p>",
+        nodes=content_nodes,
         author_name="Fin God"
     )
-    report_url = response['url']
 
     # --- [Step 2: 發送 Telegram 訊息] ---
     # 這裡我們傳送一個精美的導引文字加連結
     message = f"📊 <b>LazyNewsAI {market_name}每日新聞摘要</b>\n\n請點擊下方連結閱讀即時預覽：\n{report_url}"
     
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{TELEGRAM_API_BASE}/bot{token}/sendMessage"
     requests.post(url, data={
         'chat_id': chat_id, 
         'text': message, 
@@ -54,8 +227,6 @@ def send_to_telegram(md_path, mp3_path, market_name):
     })
 
     # --- [Step 3: 發送音檔] ---
-    url_audio = f"https://api.telegram.org/bot{token}/sendAudio"
-    with open(mp3_path, 'rb') as audio:
-        requests.post(url_audio, data={'chat_id': chat_id, 'caption': f"🎧 {market_name}新聞摘要Podcast"}, files={'audio': audio})
+    send_audio_files(token, chat_id, audio_paths, market_name)
 
     print(f"✅ {market_name} 報告已發佈至 Telegraph 並推播成功！")
\ No newline at end of file
@@ -1,5 +1,7 @@
 # 導入自己的 database 模組
 import database
+# 導入自己的 notifier 模組 (音檔大小上限以 Telegram 的上傳上限為準)
+import notifier
 
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -13,14 +15,31 @@ import argparse
 # --- [全域常數] ---
 BYTE_LIMIT = 15000
 
+# 語音輸出格式設定檔，可用 PODCAST_AUDIO_PROFILE 環境變數切換
+# format 對應 speechsdk.SpeechSynthesisOutputFormat 的名稱；bitrate_kbps 用來換算不同格式的檔案大小
+# fallback 是檔案過大時改用的較小格式 (重新合成)，沒有的話就直接分段成多個檔案
+# Opus 是變動位元率，沒有固定的 bitrate 可以換算大小，所以不設定 fallback，過大時直接分段
+AUDIO_PROFILES = {
+    'mp3_48k': {'format': 'Audio24Khz48KBitRateMonoMp3', 'extension': 'mp3', 'bitrate_kbps': 48, 'fallback': 'mp3_32k'},
+    'mp3_32k': {'format': 'Audio16Khz32KBitRateMonoMp3', 'extension': 'mp3', 'bitrate_kbps': 32, 'fallback': None},
+    'mp3_96k': {'format': 'Audio24Khz96KBitRateMonoMp3', 'extension': 'mp3', 'bitrate_kbps': 96, 'fallback': 'mp3_48k'},
+    'opus_voice': {'format': 'Ogg16Khz16BitMonoOpus', 'extension': 'ogg', 'bitrate_kbps': None, 'fallback': None},
+    'opus_24k': {'format': 'Ogg24Khz16BitMonoOpus', 'extension': 'ogg', 'bitrate_kbps': None, 'fallback': None},
+    # SDK 的預設輸出 (未壓縮 PCM)，體積最大，僅保留做為對照
+    'wav': {'format': 'Riff16Khz16BitMonoPcm', 'extension': 'wav', 'bitrate_kbps': 256, 'fallback': 'mp3_48k'},
+}
+DEFAULT_AUDIO_PROFILE = 'mp3_48k'
+# 以 Telegram Bot API 的上傳上限為準，保留一成餘裕給檔頭等估算誤差
+AUDIO_FILE_BYTE_LIMIT = int(notifier.TELEGRAM_UPLOAD_BYTE_LIMIT * 0.9)
+
 # --- [函數定義區] ---
-def create_text_chunks(text):
+def create_text_chunks(text, byte_limit=BYTE_LIMIT):
     chunks, current_chunk = [], ""
     sentences = text.replace('\n', '。').replace('！', '。').replace('？', '。').split('。')
     for sentence in sentences:
         if not sentence: continue
         sentence_with_period = sentence + "。"
-        if len((current_chunk + sentence_with_period).encode('utf-8')) > BYTE_LIMIT:
+        if len((current_chunk + sentence_with_period).encode('utf-8')) > byte_limit:
             if current_chunk: chunks.append(current_chunk)
             current_chunk = sentence_with_period
         else:
@@ -28,6 +47,53 @@ def create_text_chunks(text):
     if current_chunk: chunks.append(current_chunk)
     return chunks
 
+def get_audio_profile(profile_name=None):
+    """依名稱 (或 PODCAST_AUDIO_PROFILE 環境變數) 取得語音輸出格式設定，找不到時使用預設格式。"""
+    profile_name = profile_name or os.getenv("PODCAST_AUDIO_PROFILE") or DEFAULT_AUDIO_PROFILE
+    if profile_name not in AUDIO_PROFILES:
+        print(f"警告：未知的語音格式 '{profile_name}'，改用預設的 '{DEFAULT_AUDIO_PROFILE}'。")
+        profile_name = DEFAULT_AUDIO_PROFILE
+    return profile_name, AUDIO_PROFILES[profile_name]
+
+def synthesize_to_file(text_chunks, filename, profile, speech_key, speech_region, voice_name):
+    """
+    將所有段落合成到同一個音檔，回傳每一段的音訊資料 (其位元組數用來估算檔案大小)。
+    合成被取消時回傳 None。
+    """
+    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+    speech_config.speech_synthesis_voice_name = voice_name
+    speech_config.set_speech_synthesis_output_format(getattr(speechsdk.SpeechSynthesisOutputFormat, profile['format']))
+    audio_config = speechsdk.audio.AudioOutputConfig(filename=filename)
+    speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
+
+    chunk_audio = []
+    for i, chunk in enumerate(text_chunks):
+        print(f"  - 正在合成第 {i+1}/{len(text_chunks)} 段語音...")
+        result = speech_synthesizer.speak_text_async(chunk).get()
+        if result.reason == speechsdk.ResultReason.Canceled:
+            cancellation_details = result.cancellation_details
+            print(f"語音合成被取消: {cancellation_details.reason}")
+            if cancellation_details.reason == speechsdk.CancellationReason.Error:
+                print(f"錯誤詳情: {cancellation_details.error_details}")
+            return None
+        chunk_audio.append(result.audio_data)
+    # 釋放 synthesizer，確保音檔完整寫入並關閉
+    del speech_synthesizer
+    return chunk_audio
+
+def group_chunks_by_size(chunk_bytes, byte_limit=AUDIO_FILE_BYTE_LIMIT):
+    """依每一段的音訊大小，把段落分組成多個檔案，每組估計大小都不超過 byte_limit。回傳每組的段落索引。"""
+    groups, current, current_size = [], [], 0
+    for index, size in enumerate(chunk_bytes):
+        if current and current_size + size > byte_limit:
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(index)
+        current_size += size
+    if current:
+        groups.append(current)
+    return groups
+
 def main(market=None):
     # --- [核心邏輯：判斷 market 來源] ---
     if market is None:
@@ -63,28 +129,71 @@ def main(market=None):
     try:
         tz_taipei = ZoneInfo("Asia/Taipei")
         file_timestamp = datetime.now(tz_taipei).strftime('%Y%m%d_%H')
-        filename = f"podcast_{market}_{file_timestamp}.mp3"
-        
-        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
-        audio_config = speechsdk.audio.AudioOutputConfig(filename=filename)
         voice_name = "zh-TW-YunJheNeural"
-        speech_config.speech_synthesis_voice_name = voice_name
-        speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
+        profile_name, profile = get_audio_profile()
+        filename = f"podcast_{market}_{file_timestamp}.{profile['extension']}"
 
         text_chunks = create_text_chunks(cleaned_text)
-        print(f"報告已切分成 {len(text_chunks)} 段落，準備使用聲音 '{voice_name}' 進行合成...")
-        for i, chunk in enumerate(text_chunks):
-            print(f"  - 正在合成第 {i+1}/{len(text_chunks)} 段語音...")
-            result = speech_synthesizer.speak_text_async(chunk).get()
-            if result.reason == speechsdk.ResultReason.Canceled:
-                cancellation_details = result.cancellation_details
-                print(f"語音合成被取消: {cancellation_details.reason}")
-                if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                    print(f"錯誤詳情: {cancellation_details.error_details}")
+        print(f"報告已切分成 {len(text_chunks)} 段落，準備使用聲音 '{voice_name}' 及格式 '{profile_name}' 進行合成...")
+        chunk_audio = synthesize_to_file(text_chunks, filename, profile, speech_key, speech_region, voice_name)
+        if chunk_audio is None:
+            return
+        chunk_bytes = [len(audio) for audio in chunk_audio]
+
+        estimated_size = sum(chunk_bytes)
+        print(f"\n所有段落語音合成完畢！預估檔案大小 {estimated_size / 1024 / 1024:.2f} MB。")
+        if estimated_size <= AUDIO_FILE_BYTE_LIMIT:
+            return [filename] # 回傳給 run_all.py
+
+        # --- [檔案過大：先嘗試改用較小的格式重新合成] ---
+        fallback_name = profile['fallback']
+        if fallback_name and profile['bitrate_kbps'] and AUDIO_PROFILES[fallback_name]['bitrate_kbps']:
+            fallback = AUDIO_PROFILES[fallback_name]
+            ratio = fallback['bitrate_kbps'] / profile['bitrate_kbps']
+            if estimated_size * ratio <= AUDIO_FILE_BYTE_LIMIT:
+                print(f"音檔超過上傳上限，改用較小的格式 '{fallback_name}' 重新合成...")
+                os.remove(filename)
+                profile = fallback
+                filename = f"podcast_{market}_{file_timestamp}.{profile['extension']}"
+                chunk_audio = synthesize_to_file(text_chunks, filename, profile, speech_key, speech_region, voice_name)
+                if chunk_audio is None:
+                    return
+                chunk_bytes = [len(audio) for audio in chunk_audio]
+                print(f"重新合成完畢！預估檔案大小 {sum(chunk_bytes) / 1024 / 1024:.2f} MB。")
+                if sum(chunk_bytes) <= AUDIO_FILE_BYTE_LIMIT:
+                    return [filename]
+
+        # --- [仍然過大：依每段的實際大小分組，分成多個檔案] ---
+        os.remove(filename)
+        if profile['extension'] == 'mp3' and max(chunk_bytes) <= AUDIO_FILE_BYTE_LIMIT:
+            # MP3 由獨立的音框組成，可以直接把已合成的段落音訊接起來寫成分段檔案，不必再付費重新合成
+            groups = group_chunks_by_size(chunk_bytes, AUDIO_FILE_BYTE_LIMIT)
+            print(f"音檔超過上傳上限，依段落大小分成 {len(groups)} 個檔案...")
+            filenames = []
+            for part, group in enumerate(groups, 1):
+                part_filename = f"podcast_{market}_{file_timestamp}_part{part}.{profile['extension']}"
+                with open(part_filename, 'wb') as f:
+                    for i in group:
+                        f.write(chunk_audio[i])
+                filenames.append(part_filename)
+            return filenames # 回傳給 run_all.py
+
+        # Ogg / WAV 的檔頭無法直接串接，單一段落過大時也必須把文字切得更細，這兩種情況才重新合成
+        if max(chunk_bytes) > AUDIO_FILE_BYTE_LIMIT:
+            # 單一段落就超過上限時，依「每個文字位元組對應多少音訊位元組」把段落切得更細再估算
+            audio_bytes_per_text_byte = sum(chunk_bytes) / sum(len(c.encode('utf-8')) for c in text_chunks)
+            text_chunks = create_text_chunks(cleaned_text, byte_limit=int(AUDIO_FILE_BYTE_LIMIT / audio_bytes_per_text_byte))
+            chunk_bytes = [len(c.encode('utf-8')) * audio_bytes_per_text_byte for c in text_chunks]
+        groups = group_chunks_by_size(chunk_bytes, AUDIO_FILE_BYTE_LIMIT)
+        print(f"音檔超過上傳上限，依段落大小分成 {len(groups)} 個檔案重新合成...")
+        filenames = []
+        for part, group in enumerate(groups, 1):
+            part_filename = f"podcast_{market}_{file_timestamp}_part{part}.{profile['extension']}"
+            part_audio = synthesize_to_file([text_chunks[i] for i in group], part_filename, profile, speech_key, speech_region, voice_name)
+            if part_audio is None:
                 return
-        
-        print("\n所有段落語音合成完畢！")
-        return filename # 回傳給 run_all.py
+            filenames.append(part_filename)
+        return filenames # 回傳給 run_all.py
     except Exception as e:
         print(f"AI 轉podcast或存檔過程中發生錯誤: {e}")
         sys.exit(1) # 使用非 0 的 exit code 代表錯誤
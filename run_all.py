@@ -37,10 +37,10 @@ def main():
         print(f"❌ AI 分析失敗: {e}")
         sys.exit(1)
 
-    # Step 3: 語音合成 (取得 MP3 檔名)
+    # Step 3: 語音合成 (取得音檔檔名列表，檔案過大時會分成多個檔案)
     try:
         print("\n--- 3. 啟動 AI 播音員 ---")
-        mp3_file = podcaster.main(market=market) # 記得修改 podcaster.py 的 main() 讓他 return 檔名
+        audio_files = podcaster.main(market=market) # 記得修改 podcaster.py 的 main() 讓他 return 檔名
     except Exception as e:
         print(f"❌ 語音合成失敗: {e}")
         sys.exit(1)
@@ -48,7 +48,7 @@ def main():
     # Step 4: Telegram 推播
     try:
         print(f"\n--- 4. 發送至 Telegram ({market_name}) ---")
-        notifier.send_to_telegram(md_file, mp3_file, market_name)
+        notifier.send_to_telegram(md_file, audio_files, market_name)
     except Exception as e:
         print(f"❌ Telegram 發送失敗: {e}")
 
@@ -0,0 +1,63 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(database, 'DB_FILE', str(tmp_path / 'news.db'))
+    database.setup_database()
+    yield database.DB_FILE
+    capsys.readouterr()
+
+
+def make_article(url, headline='標題'):
+    return {'headline': headline, 'url': url, 'content': '台積電', 'datetime': datetime(2026, 1, 1)}
+
+
+def test_add_articles_keeps_good_rows_when_one_row_fails(db):
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TRIGGER reject_bad BEFORE INSERT ON articles WHEN NEW.url = 'bad' BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    conn.commit()
+    conn.close()
+
+    batch = [make_article('a'), make_article('bad'), make_article('no-headline', headline=None), make_article('b')]
+
+    assert database.add_articles(batch, 'TW') == 2
+    assert sorted(a['url'] for a in database.get_all_articles_for_analysis('TW')) == ['a', 'b']
+
+
+def test_same_url_in_both_markets_is_stored_once(db):
+    assert database.add_articles([make_article('shared')], 'TW') == 1
+    assert database.add_articles([make_article('shared')], 'US') == 1
+
+    assert [a['url'] for a in database.get_all_articles_for_analysis('TW')] == ['shared']
+    assert [a['url'] for a in database.get_all_articles_for_analysis('US')] == ['shared']
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 1
+    conn.close()
+
+
+def test_clear_all_data_keeps_articles_still_linked_to_other_market(db):
+    database.add_articles([make_article('shared'), make_article('tw-only')], 'TW')
+    database.add_articles([make_article('shared')], 'US')
+
+    database.clear_all_data('TW')
+
+    assert database.count_market_articles('TW') == 0
+    assert [a['url'] for a in database.get_all_articles_for_analysis('US')] == ['shared']
+    conn = sqlite3.connect(db)
+    assert [row[0] for row in conn.execute("SELECT url FROM articles")] == ['shared']
+    # 只剩下共用文章的提及紀錄，TW 專屬文章的提及一併刪除
+    mention_urls = conn.execute(
+        "SELECT a.url FROM article_mentions m JOIN articles a ON a.id = m.article_id"
+    ).fetchall()
+    orphaned_mentions = conn.execute(
+        "SELECT COUNT(*) FROM article_mentions WHERE article_id NOT IN (SELECT id FROM articles)"
+    ).fetchone()[0]
+    conn.close()
+    assert mention_urls == [('shared',)]
+    assert orphaned_mentions == 0
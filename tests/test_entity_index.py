@@ -0,0 +1,15 @@
+import pytest
+
+import entity_index
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2002年金融海嘯", {}),                              # 年份不是股票代號
+    ("中鋼(2002)與中鋼構", {'2002': 1, '2013': 1}),
+    ("長榮航與長榮海運", {'2618': 1, '2603': 1}),
+    ("台積電(2330)大漲，2317.TW 跟漲", {'2330': 1, '2317': 1}),
+    ("台積電ADR 與 12330", {'TSM': 1}),
+    ("AMD 與 metaverse", {'AMD': 1}),
+])
+def test_count_mentions(text, expected):
+    assert entity_index.count_mentions(text) == expected
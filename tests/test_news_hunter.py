@@ -0,0 +1,109 @@
+import gc
+import sys
+import tracemalloc
+import types
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("bs4")
+
+# 測試環境不需要真的啟動瀏覽器，沒有安裝 selenium 時放一個空殼模組
+try:
+    import selenium.webdriver.chrome.options  # noqa: F401
+except ImportError:
+    for name in ['selenium', 'selenium.webdriver', 'selenium.webdriver.chrome', 'selenium.webdriver.chrome.options']:
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules['selenium'].webdriver = sys.modules['selenium.webdriver']
+    sys.modules['selenium.webdriver.chrome.options'].Options = object
+
+try:
+    import requests  # noqa: F401
+except ImportError:
+    requests_stub = types.ModuleType('requests')
+    requests_stub.exceptions = types.SimpleNamespace(RequestException=Exception)
+    sys.modules['requests'] = requests_stub
+
+import database
+import news_hunter
+
+NOW = datetime.now(timezone.utc)
+
+
+def make_list_page(count):
+    items = "".join(
+        f"<li><div><span>{i + 1} 分鐘前</span></div><h3><a href='/news/{i}'>標題{i}</a></h3></li>"
+        for i in range(count)
+    )
+    return f"<div id='YDC-Stream-Proxy'><ul>{items}</ul></div>"
+
+
+def make_article_page(index):
+    publish_time = (NOW - timedelta(minutes=index)).isoformat()
+    paragraphs = "".join(f"<p>台積電第{index}篇第{j}段 " + "內容" * 200 + "</p>" for j in range(10))
+    return f"<html><body><time datetime='{publish_time}'></time><article>{paragraphs}</article></body></html>"
+
+
+class FakeResponse:
+    def __init__(self, url):
+        self.text = make_article_page(int(url.rsplit('/', 1)[1]))
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def crawl(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(database, 'DB_FILE', str(tmp_path / 'news.db'))
+    monkeypatch.setattr(news_hunter.requests, 'get', lambda url, headers=None, timeout=None: FakeResponse(url), raising=False)
+    database.setup_database()
+
+    def run(count, market):
+        """跑完整條管線 (含捲動階段的時間掃描)，回傳 (新增文章數, 時間掃描結果, tracemalloc 峰值)"""
+        page_source = make_list_page(count)
+        gc.collect()
+        tracemalloc.start()
+        scan_result = news_hunter.scan_news_list_times(page_source, NOW)
+        stats = {'listed': 0, 'saved_fetches': 0}
+        news_items = news_hunter.iter_news_list(page_source, stats)
+        page_source = None
+        articles = news_hunter.iter_article_details(news_items, stats)
+        recent_articles = news_hunter.filter_time_window(articles, NOW - timedelta(days=1))
+        new_articles_count = news_hunter.write_articles_in_batches(recent_articles, market)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        capsys.readouterr()
+        return new_articles_count, scan_result, peak
+
+    return run
+
+
+def test_peak_memory_stays_flat_as_list_grows(crawl):
+    small_count, small_scan, small_peak = crawl(30, 'TW')
+    large_count, large_scan, large_peak = crawl(300, 'US')
+
+    assert small_count == 30
+    assert large_count == 300
+    # 捲動階段只需要項目數與最新/最舊兩則新聞的時間
+    assert large_scan == (300, NOW - timedelta(minutes=1), NOW - timedelta(minutes=300))
+    assert small_scan[0] == 30
+    # 文章數多 10 倍，峰值記憶體只允許多出少量 (標題/網址清單與批次緩衝區)
+    assert large_peak < small_peak * 1.5
+
+
+def test_cached_article_is_reused_instead_of_downloaded(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(database, 'DB_FILE', str(tmp_path / 'news.db'))
+    database.setup_database()
+    url = 'https://tw.stock.yahoo.com/news/1'
+    database.add_articles([{'headline': '標題1', 'url': url, 'content': '台積電', 'datetime': NOW}], 'TW')
+
+    def fail_get(*args, **kwargs):
+        raise AssertionError("快取命中時不應該下載文章")
+    monkeypatch.setattr(news_hunter.requests, 'get', fail_get, raising=False)
+
+    stats = {'listed': 1, 'saved_fetches': 0}
+    articles = list(news_hunter.iter_article_details([{'headline': '標題1', 'url': url}], stats))
+    capsys.readouterr()
+
+    assert stats['saved_fetches'] == 1
+    assert [(a['url'], a['content'], a['datetime']) for a in articles] == [(url, '台積電', NOW)]
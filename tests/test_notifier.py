@@ -0,0 +1,140 @@
+import json
+import re
+
+import pytest
+
+pytest.importorskip("requests")
+telegraph_utils = pytest.importorskip("telegraph.utils")
+
+import notifier
+
+TELEGRAPH_CONTENT_LIMIT = 64 * 1024
+
+
+def old_markdown_to_html(md_text):
+    """原本 notifier.markdown_to_html 的實作，做為渲染結果的對照組"""
+    html = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', md_text)
+    html = re.sub(r'^###\s+(.*)', r'<h3>\1</h3>', html, flags=re.MULTILINE)
+    html = re.sub(r'^##\s+(.*)', r'<h3>\1</h3>', html, flags=re.MULTILINE)
+    html = html.replace('\n', '<br>')
+    return f"<p>{html}</p>"
+
+
+def rendered_lines(nodes):
+    """把節點攤平成畫面上看到的各行文字，粗體以 ** 標示、標題以 [h3] 標示，段落與換行都視為斷行"""
+    parts = []
+
+    def walk(node):
+        if isinstance(node, str):
+            parts.append(node)
+            return
+        tag = node['tag']
+        if tag == 'br':
+            parts.append('\n')
+        elif tag == 'b':
+            parts.append('**')
+            for child in node.get('children', []):
+                walk(child)
+            parts.append('**')
+        else:
+            parts.append('\n[h3]' if tag == 'h3' else '\n')
+            for child in node.get('children', []):
+                walk(child)
+            parts.append('\n')
+
+    for node in nodes:
+        walk(node)
+    return [line.strip() for line in ''.join(parts).split('\n') if line.strip()]
+
+
+def content_size(content):
+    return len(json.dumps(content, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+
+SAMPLE_REPORT = """大家好，以下為24小時內台股新聞重點摘要
+
+### **市場摘要**
+今天 **台積電** 大漲，加權指數上漲 **200 點**。
+外資買超。
+
+## 焦點板塊與題材
+AI 伺服器與**散熱**族群持續受到關注。
+
+本集內容由 AI 自動生成"""
+
+
+def test_markdown_to_nodes_matches_old_rendering():
+    old_nodes = telegraph_utils.html_to_nodes(old_markdown_to_html(SAMPLE_REPORT))
+    new_nodes = notifier.markdown_to_nodes(SAMPLE_REPORT)
+
+    assert rendered_lines(new_nodes) == rendered_lines(old_nodes)
+
+
+def test_markdown_to_nodes_emits_paragraphs_headings_and_bold():
+    nodes = notifier.markdown_to_nodes("第一行\n第二行 **重點**\n\n## 標題")
+
+    assert nodes == [
+        {'tag': 'p', 'children': ['第一行', {'tag': 'br'}, '第二行 ', {'tag': 'b', 'children': ['重點']}]},
+        {'tag': 'h3', 'children': ['標題']},
+    ]
+
+
+def test_ordered_list_keeps_numbering_across_indented_sub_bullets():
+    report = "1. **台積電**\n    * 法說會上調財測\n    * 外資買超\n\n2. **鴻海**\n    * AI 伺服器出貨\n3. **聯發科**"
+    nodes = notifier.markdown_to_nodes(report)
+
+    assert nodes == [{'tag': 'ol', 'children': [
+        {'tag': 'li', 'children': [{'tag': 'b', 'children': ['台積電']}, {'tag': 'ul', 'children': [
+            {'tag': 'li', 'children': ['法說會上調財測']},
+            {'tag': 'li', 'children': ['外資買超']},
+        ]}]},
+        {'tag': 'li', 'children': [{'tag': 'b', 'children': ['鴻海']}, {'tag': 'ul', 'children': [
+            {'tag': 'li', 'children': ['AI 伺服器出貨']},
+        ]}]},
+        {'tag': 'li', 'children': [{'tag': 'b', 'children': ['聯發科']}]},
+    ]}]
+
+
+class FakeTelegraph:
+    def __init__(self):
+        self.pages = []
+
+    def create_page(self, title, content, author_name):
+        self.pages.append(content)
+        return {'url': f"https://telegra.ph/page-{len(self.pages)}"}
+
+
+@pytest.mark.parametrize("report", [
+    SAMPLE_REPORT * 600,                    # 很多一般大小的段落
+    "台積電" * 40000 + "\n" + "鴻海" * 30000, # 單一段落就超過上限
+])
+def test_published_pages_stay_under_limit_including_next_link(report):
+    tg = FakeTelegraph()
+    nodes = notifier.markdown_to_nodes(report)
+
+    first_url = notifier.publish_to_telegraph(tg, "台股新聞摘要", nodes, "Fin God")
+
+    # 頁面是從最後一頁開始建立的
+    pages = list(reversed(tg.pages))
+    assert first_url == f"https://telegra.ph/page-{len(pages)}"
+    assert len(pages) > 1
+    for page in pages:
+        assert content_size(page) <= TELEGRAPH_CONTENT_LIMIT
+    for page in pages[:-1]:
+        assert page[-1]['children'][0]['tag'] == 'a'
+    # 拿掉「下一頁」連結後接回來，內容必須和原本一樣 (過大的段落會被拆成多段，所以比對合併後的文字)
+    joined_nodes = [node for page in pages[:-1] for node in page[:-1]] + pages[-1]
+    assert ''.join(rendered_lines(joined_nodes)) == ''.join(rendered_lines(nodes))
+
+
+def test_ogg_files_are_sent_as_voice_messages(tmp_path, monkeypatch):
+    posts = []
+    monkeypatch.setattr(notifier.requests, 'post', lambda url, data=None, files=None: posts.append((url, data, list(files))))
+    voice_path, audio_path = tmp_path / 'podcast.ogg', tmp_path / 'podcast.mp3'
+    voice_path.write_bytes(b'ogg')
+    audio_path.write_bytes(b'mp3')
+
+    notifier.send_audio_files('token', 'chat', [str(voice_path), str(audio_path)], '台股')
+
+    assert [(url.rsplit('/', 1)[1], fields) for url, _, fields in posts] == [('sendVoice', ['voice']), ('sendAudio', ['audio'])]
+    assert posts[0][1]['caption'].endswith('(1/2)')
@@ -0,0 +1,84 @@
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("telegraph")
+
+# 測試不會真的呼叫 Azure，沒有安裝語音 SDK 或 dotenv 時放空殼模組
+try:
+    import azure.cognitiveservices.speech  # noqa: F401
+except ImportError:
+    for name in ['azure', 'azure.cognitiveservices', 'azure.cognitiveservices.speech']:
+        sys.modules[name] = types.ModuleType(name)
+
+try:
+    import dotenv  # noqa: F401
+except ImportError:
+    sys.modules['dotenv'] = types.ModuleType('dotenv')
+    sys.modules['dotenv'].load_dotenv = lambda: None
+
+import podcaster
+
+# 約 30000 bytes 的報告，會被切成 3 段 (每段上限 15000 bytes)
+REPORT = "。".join("台積電" * 667 for _ in range(5))
+
+
+@pytest.fixture
+def synth(tmp_path, monkeypatch, capsys):
+    """以假的 synthesize_to_file 執行 podcaster.main，回傳 (產生的檔名, 每次合成使用的格式)"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AZURE_SPEECH_KEY", "key")
+    monkeypatch.setenv("AZURE_SPEECH_REGION", "region")
+    monkeypatch.setattr(podcaster.database, 'get_latest_summary', lambda market: {'summary_text': REPORT})
+    calls = []
+
+    def fake_synthesize(text_chunks, filename, profile, speech_key, speech_region, voice_name):
+        # 每個文字位元組產生 bitrate/32 個音訊位元組，每段用不同的位元組內容方便辨認
+        calls.append(profile['format'])
+        rate = (profile['bitrate_kbps'] or 32) / 32
+        chunk_audio = [bytes([i]) * int(len(chunk.encode('utf-8')) * rate) for i, chunk in enumerate(text_chunks)]
+        with open(filename, 'wb') as f:
+            f.write(b''.join(chunk_audio))
+        return chunk_audio
+    monkeypatch.setattr(podcaster, 'synthesize_to_file', fake_synthesize)
+
+    def run(profile_name, byte_limit):
+        monkeypatch.setenv("PODCAST_AUDIO_PROFILE", profile_name)
+        monkeypatch.setattr(podcaster, 'AUDIO_FILE_BYTE_LIMIT', byte_limit)
+        filenames = podcaster.main(market='TW')
+        capsys.readouterr()
+        return filenames, calls
+
+    return run
+
+
+def test_report_under_limit_is_a_single_file(synth, tmp_path):
+    filenames, calls = synth('mp3_48k', 100000)
+
+    assert len(filenames) == 1 and filenames[0].endswith('.mp3')
+    assert (tmp_path / filenames[0]).exists()
+    assert calls == ['Audio24Khz48KBitRateMonoMp3']
+
+
+def test_oversized_wav_falls_back_to_mp3_48k(synth, tmp_path):
+    # WAV 約 240000 bytes，換成 48 kbps MP3 約 45000 bytes
+    filenames, calls = synth('wav', 100000)
+
+    assert len(filenames) == 1 and filenames[0].endswith('.mp3')
+    assert calls == ['Riff16Khz16BitMonoPcm', 'Audio24Khz48KBitRateMonoMp3']
+    assert sorted(p.name for p in tmp_path.iterdir()) == filenames
+
+
+def test_oversized_mp3_is_split_from_synthesized_chunks(synth, tmp_path):
+    # 約 45000 bytes，改用 32 kbps 仍有約 30000 bytes，超過上限只能分段
+    filenames, calls = synth('mp3_48k', 20000)
+
+    assert calls == ['Audio24Khz48KBitRateMonoMp3'] # 沒有重新合成
+    assert [name.rsplit('_', 1)[1] for name in filenames] == ['part1.mp3', 'part2.mp3', 'part3.mp3']
+    assert sorted(p.name for p in tmp_path.iterdir()) == filenames
+    for index, name in enumerate(filenames):
+        data = (tmp_path / name).read_bytes()
+        assert 0 < len(data) <= 20000
+        assert set(data) == {index} # 每個分段檔案就是原本第 index 段的音訊